@@ -19,32 +19,60 @@ updater.sh update kotlinc
 """
 
 import argparse
+import concurrent.futures
+import importlib.util
 import json
 import os
 import subprocess
+import sys
+import threading
 import time
 
+# Use the faster C++ protobuf implementation when it is available. This
+# must be set before protobuf is first imported, and only when the
+# native extension actually exists; newer protobuf releases fail to
+# import if the requested backend is missing.
+if importlib.util.find_spec('google.protobuf.pyext._message') is not None:
+    os.environ.setdefault('PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION', 'cpp')
+
 from google.protobuf import text_format    # pylint: disable=import-error
 
 from git_updater import GitUpdater
 from github_archive_updater import GithubArchiveUpdater
 import fileutils
 import git_utils
+import github_archive_updater
 import updater_utils
 
 
 UPDATERS = [GithubArchiveUpdater, GitUpdater]
 
+# Projects are checked in parallel and results are printed as they come.
+# This lock prevents prints for different projects from interleaving.
+PRINT_LOCK = threading.Lock()
+
+
+# Checked once at startup instead of per message.
+USE_COLOR = sys.stdout.isatty()
+
+COLORS = {
+    'FRESH': '\x1b[32m',
+    'STALE': '\x1b[31;1m',
+    'ERROR': '\x1b[31m',
+}
+END_COLOR = '\033[0m'
+
 
 def color_string(string, color):
     """Changes the color of a string when print to terminal."""
-    colors = {
-        'FRESH': '\x1b[32m',
-        'STALE': '\x1b[31;1m',
-        'ERROR': '\x1b[31m',
-    }
-    end_color = '\033[0m'
-    return colors[color] + string + end_color
+    if not USE_COLOR:
+        return string
+    return COLORS[color] + string + END_COLOR
+
+
+# The two fixed per-project results, formatted once.
+FRESH_MSG = color_string(' Up to date.', 'FRESH')
+STALE_MSG = color_string(' Out of date!', 'STALE')
 
 
 def build_updater(proj_path):
@@ -56,23 +84,22 @@ def build_updater(proj_path):
       proj_path: Absolute or relative path to the project.
 
     Returns:
-      The updater object built. None if there's any error.
+      A tuple of (updater, error message). updater is None if there's
+      any error.
     """
 
     proj_path = fileutils.get_absolute_project_path(proj_path)
     try:
         metadata = fileutils.read_metadata(proj_path)
     except text_format.ParseError as err:
-        print('{} {}.'.format(color_string('Invalid metadata file:', 'ERROR'),
-                              err))
-        return None
+        return (None, '{} {}.'.format(
+            color_string('Invalid metadata file:', 'ERROR'), err))
 
     try:
         updater = updater_utils.create_updater(metadata, proj_path, UPDATERS)
     except ValueError:
-        print(color_string('No supported URL.', 'ERROR'))
-        return None
-    return updater
+        return (None, color_string('No supported URL.', 'ERROR'))
+    return (updater, None)
 
 
 def has_new_version(updater):
@@ -92,26 +119,35 @@ def check_update(proj_path):
       proj_path: Absolute or relative path to the project.
     """
 
-    print(
-        'Checking {}. '.format(fileutils.get_relative_project_path(proj_path)),
-        end='')
-    updater = build_updater(proj_path)
+    # Output for a project is buffered and written in one go, so that
+    # parallel checks don't interleave and each project costs a single
+    # stdout write.
+    messages = ['Checking {}. '.format(
+        fileutils.get_relative_project_path(proj_path))]
+
+    def flush_messages():
+        with PRINT_LOCK:
+            sys.stdout.write(''.join(messages) + '\n')
+
+    updater, err = build_updater(proj_path)
     if updater is None:
+        messages.append(err)
+        flush_messages()
         return (None, 'Failed to create updater')
     try:
-        updater.check()
-        if has_new_version(updater):
-            print(color_string(' Out of date!', 'STALE'))
-        else:
-            print(color_string(' Up to date.', 'FRESH'))
+        messages.append(updater.check())
+        messages.append(STALE_MSG if has_new_version(updater) else FRESH_MSG)
+        flush_messages()
         return (updater, None)
     except (IOError, ValueError) as err:
-        print('{} {}.'.format(color_string('Failed.', 'ERROR'),
-                              err))
+        messages.append('{} {}.'.format(color_string('Failed.', 'ERROR'),
+                                        err))
+        flush_messages()
         return (updater, str(err))
     except subprocess.CalledProcessError as err:
         msg = _message_for_calledprocesserror(err)
-        print('{}\n{}'.format(msg, color_string('Failed.', 'ERROR')))
+        messages.append('{}\n{}'.format(msg, color_string('Failed.', 'ERROR')))
+        flush_messages()
         return (updater, msg)
 
 
@@ -126,38 +162,107 @@ def _process_update_result(path):
     return res
 
 
-def _check_some(paths, delay):
-    results = {}
+def _check_serially(paths, delay):
     for path in paths:
         relative_path = fileutils.get_relative_project_path(path)
-        results[relative_path] = _process_update_result(path)
+        yield (relative_path, _process_update_result(path))
         time.sleep(delay)
-    return results
 
 
-def _check_all(delay):
-    results = {}
-    for path, dirs, files in os.walk(fileutils.EXTERNAL_PATH):
-        dirs.sort(key=lambda d: d.lower())
-        if fileutils.METADATA_FILENAME in files:
-            # Skip sub directories.
-            dirs[:] = []
+def _check_in_parallel(paths, jobs):
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        future_to_path = {
+            executor.submit(_process_update_result, path): path
+            for path in paths
+        }
+        for future in concurrent.futures.as_completed(future_to_path):
+            path = future_to_path[future]
             relative_path = fileutils.get_relative_project_path(path)
-            results[relative_path] = _process_update_result(path)
-            time.sleep(delay)
-    return results
+            yield (relative_path, future.result())
+
+
+# Directory scans block on readdir/stat latency rather than CPU, so the
+# walk overlaps many directories at once.
+WALK_JOBS = 16
+
+
+def _scan_project_dir(path):
+    """Scans one directory for a project.
+
+    Returns:
+        A tuple (project_path, sub_dirs). project_path is the input path
+        if it holds a METADATA file (and sub_dirs is empty), else None.
+    """
+    # One stat for METADATA is cheaper than listing the directory
+    # when the project is a leaf with many files.
+    if os.path.isfile(os.path.join(path, fileutils.METADATA_FILENAME)):
+        # Skip sub directories.
+        return (path, [])
+    try:
+        with os.scandir(path) as entry_it:
+            return (None, [entry.path for entry in entry_it
+                           if entry.is_dir(follow_symlinks=False)])
+    except OSError:
+        # Skip unreadable directories, as os.walk did.
+        return (None, [])
+
+
+def _list_all_project_paths():
+    paths = []
+    with concurrent.futures.ThreadPoolExecutor(
+            max_workers=WALK_JOBS) as executor:
+        pending = {executor.submit(_scan_project_dir,
+                                   fileutils.EXTERNAL_PATH)}
+        while pending:
+            done, pending = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                project_path, sub_dirs = future.result()
+                if project_path is not None:
+                    paths.append(project_path)
+                pending |= {executor.submit(_scan_project_dir, sub_dir)
+                            for sub_dir in sub_dirs}
+    # The walk finishes in completion order; sort to keep the stable
+    # case-insensitive order the serial walk produced.
+    paths.sort(key=str.lower)
+    return paths
+
+
+def _write_json_results(results_it, json_output):
+    """Writes results to a json file as they are produced.
+
+    Each result is flushed when it completes, so progress survives an
+    interrupted run and nothing is buffered until the end.
+    """
+    with open(json_output, 'w') as json_file:
+        json_file.write('{')
+        separator = '\n'
+        for relative_path, result in results_it:
+            json_file.write('{}    {}: {}'.format(
+                separator, json.dumps(relative_path),
+                json.dumps(result, sort_keys=True)))
+            json_file.flush()
+            separator = ',\n'
+        json_file.write('\n}\n')
 
 
 def check(args):
     """Handler for check command."""
-    if args.all:
-        results = _check_all(args.delay)
+    paths = _list_all_project_paths() if args.all else args.paths
+    if args.jobs > 1:
+        # In parallel mode --delay becomes a minimum interval between
+        # GitHub API requests, instead of a sleep between projects.
+        github_archive_updater.set_rate_limit(args.delay)
+        results_it = _check_in_parallel(paths, args.jobs)
     else:
-        results = _check_some(args.paths, args.delay)
+        results_it = _check_serially(paths, args.delay)
 
     if args.json_output is not None:
-        with open(args.json_output, 'w') as f:
-            json.dump(results, f, sort_keys=True, indent=4)
+        _write_json_results(results_it, args.json_output)
+    else:
+        # Results are printed as they are checked; just drain.
+        for _ in results_it:
+            pass
 
 
 def update(args):
@@ -175,6 +280,7 @@ def update(args):
 
 
 TMP_BRANCH_NAME = 'tmp_auto_upgrade'
+COMMIT_MESSAGE_TEMPLATE = 'Upgrade {project} to {version}\n\nTest: None'
 
 
 def _do_update(args):
@@ -197,8 +303,8 @@ def _do_update(args):
     updater.update()
 
     if args.branch_and_commit:
-        msg = 'Upgrade {} to {}\n\nTest: None'.format(
-            args.path, updater.get_latest_version())
+        msg = COMMIT_MESSAGE_TEMPLATE.format(
+            project=args.path, version=updater.get_latest_version())
         git_utils.add_file(full_path, '*')
         git_utils.commit(full_path, msg)
 
@@ -232,7 +338,14 @@ def parse_args():
         help='If set, check updates for all supported projects.')
     check_parser.add_argument(
         '--delay', default=0, type=int,
-        help='Time in seconds to wait between checking two projects.')
+        help='Time in seconds to wait between checking two projects. '
+        'When more than one job is used, the minimum interval in '
+        'seconds between GitHub API requests instead.')
+    check_parser.add_argument(
+        '--jobs', default=1, type=int,
+        help='Number of projects to check in parallel. '
+        'When more than one job is used, --delay throttles GitHub API '
+        'requests instead of sleeping between projects.')
     check_parser.set_defaults(func=check)
 
     # Creates parser for update command.
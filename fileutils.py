@@ -14,8 +14,12 @@
 """Tool functions to deal with files."""
 
 import datetime
+import functools
+import hashlib
 import os
+import tempfile
 
+from google.protobuf import message    # pylint: disable=import-error
 from google.protobuf import text_format    # pylint: disable=import-error
 
 import metadata_pb2    # pylint: disable=import-error
@@ -25,30 +29,63 @@ EXTERNAL_PATH = os.path.join(ANDROID_TOP, 'external/')
 
 METADATA_FILENAME = 'METADATA'
 
+# Parsed METADATA files are cached in binary form, keyed by the path,
+# mtime and size of the text file. Parsing the binary wire format is
+# much faster than parsing text format.
+METADATA_CACHE_DIR = os.path.expanduser('~/.cache/external_updater/metadata')
 
+
+@functools.lru_cache(maxsize=None)
 def get_absolute_project_path(project_path):
     """Gets absolute path of a project.
 
-    Path resolution starts from external/.
+    Path resolution starts from external/. Results are cached, as the
+    same project path is resolved several times during a check.
     """
     return os.path.join(EXTERNAL_PATH, project_path)
 
 
+@functools.lru_cache(maxsize=None)
 def get_metadata_path(project_path):
     """Gets the absolute path of METADATA for a project."""
     return os.path.join(
         get_absolute_project_path(project_path), METADATA_FILENAME)
 
 
+@functools.lru_cache(maxsize=None)
 def get_relative_project_path(project_path):
     """Gets the relative path of a project starting from external/."""
     project_path = get_absolute_project_path(project_path)
     return os.path.relpath(project_path, EXTERNAL_PATH)
 
 
+def _metadata_cache_path(metadata_path):
+    """Gets the cache file path for a METADATA file."""
+    stat = os.stat(metadata_path)
+    key = hashlib.blake2b('{}:{}:{}'.format(
+        metadata_path, stat.st_mtime_ns, stat.st_size).encode()).hexdigest()
+    return os.path.join(METADATA_CACHE_DIR, key + '.pb')
+
+
+def _write_metadata_cache(cache_path, metadata):
+    """Writes a parsed METADATA proto to the cache atomically."""
+    try:
+        os.makedirs(METADATA_CACHE_DIR, exist_ok=True)
+        file_descriptor, tmp_path = tempfile.mkstemp(dir=METADATA_CACHE_DIR)
+        with os.fdopen(file_descriptor, 'wb') as cache_file:
+            cache_file.write(metadata.SerializeToString())
+        os.replace(tmp_path, cache_path)
+    except IOError:
+        # The cache is only an optimization. Ignore write failures.
+        pass
+
+
 def read_metadata(proj_path):
     """Reads and parses METADATA file for a project.
 
+    The parsed proto is cached in binary form, so repeated runs over an
+    unchanged METADATA file skip the text format parse.
+
     Args:
       proj_path: Path to the project.
 
@@ -60,9 +97,19 @@ def read_metadata(proj_path):
       FileNotFoundError: Occurred when METADATA file is not found.
     """
 
-    with open(get_metadata_path(proj_path), 'r') as metadata_file:
-        metadata = metadata_file.read()
-        return text_format.Parse(metadata, metadata_pb2.MetaData())
+    metadata_path = get_metadata_path(proj_path)
+    cache_path = _metadata_cache_path(metadata_path)
+    try:
+        with open(cache_path, 'rb') as cache_file:
+            return metadata_pb2.MetaData.FromString(cache_file.read())
+    except (IOError, message.DecodeError):
+        pass
+
+    with open(metadata_path, 'r') as metadata_file:
+        metadata = text_format.Parse(metadata_file.read(),
+                                     metadata_pb2.MetaData())
+    _write_metadata_cache(cache_path, metadata)
+    return metadata
 
 
 def write_metadata(proj_path, metadata):
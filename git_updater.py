@@ -25,6 +25,8 @@ import updater_utils
 class GitUpdater():
     """Updater for Git upstream."""
 
+    SUPPORTED_URL_TYPE = metadata_pb2.URL.GIT
+
     def __init__(self, url, proj_path, metadata):
         if url.type != metadata_pb2.URL.GIT:
             raise ValueError('Only support GIT upstream.')
@@ -33,36 +35,59 @@ class GitUpdater():
         self.upstream_url = url
         self.upstream_remote_name = None
         self.android_remote_name = None
+        self.upstream_branch = None
+        self.android_branch = None
         self.new_version = None
+        self.fetched = False
 
     def _setup_remote(self):
         remotes = git_utils.list_remotes(self.proj_path)
         for name, url in remotes.items():
-            if url == self.upstream_url.value:
+            if self.upstream_remote_name is None and \
+                    url == self.upstream_url.value:
                 self.upstream_remote_name = name
 
             # Guess android remote name.
-            if '/platform/external/' in url:
+            if self.android_remote_name is None and \
+                    '/platform/external/' in url:
                 self.android_remote_name = name
 
+            if self.upstream_remote_name is not None and \
+                    self.android_remote_name is not None:
+                break
+
         if self.upstream_remote_name is None:
             self.upstream_remote_name = "update_origin"
             git_utils.add_remote(self.proj_path, self.upstream_remote_name,
                                  self.upstream_url.value)
 
+        self.upstream_branch = self.upstream_remote_name + '/master'
+        if self.android_remote_name is not None:
+            self.android_branch = self.android_remote_name + '/master'
+
+    def _fetch_remotes(self):
+        """Fetches the remotes, at most once per updater.
+
+        Checking tags only talks to the remote with ls-remote, so the
+        expensive object download is deferred until something needs the
+        history locally: counting commits behind a remote head, or
+        merging during update().
+        """
+        if self.fetched:
+            return
         git_utils.fetch(self.proj_path,
                         [self.upstream_remote_name, self.android_remote_name])
+        self.fetched = True
 
     def check(self):
-        """Checks upstream and returns whether a new version is available."""
+        """Checks upstream and returns a summary of the result."""
 
         self._setup_remote()
         if git_utils.is_commit(self.metadata.third_party.version):
             # Update to remote head.
-            self._check_head()
-        else:
-            # Update to latest version tag.
-            self._check_tag()
+            return self._check_head()
+        # Update to latest version tag.
+        return self._check_tag()
 
     def get_current_version(self):
         """Returns the latest version name recorded in METADATA."""
@@ -78,38 +103,38 @@ class GitUpdater():
         current_ver = self.get_current_version()
         self.new_version = updater_utils.get_latest_version(
             current_ver, tags)
-        print('Current version: {}. Latest version: {}'.format(
-            current_ver, self.new_version), end='')
+        return 'Current version: {}. Latest version: {}'.format(
+            current_ver, self.new_version)
 
     def _check_head(self):
+        self._fetch_remotes()
         commits = git_utils.get_commits_ahead(
-            self.proj_path, self.upstream_remote_name + '/master',
-            self.android_remote_name + '/master')
+            self.proj_path, self.upstream_branch, self.android_branch)
 
         if not commits:
             self.new_version = self.get_current_version()
-            return
+            return ''
 
         self.new_version = commits[0]
 
         commit_time = git_utils.get_commit_time(self.proj_path, commits[-1])
         time_behind = datetime.datetime.now() - commit_time
-        print('{} commits ({} days) behind.'.format(
-            len(commits), time_behind.days), end='')
+        return '{} commits ({} days) behind.'.format(
+            len(commits), time_behind.days)
 
     def _write_metadata(self, path):
-        updated_metadata = metadata_pb2.MetaData()
-        updated_metadata.CopyFrom(self.metadata)
-        updated_metadata.third_party.version = self.new_version
-        fileutils.write_metadata(path, updated_metadata)
+        # Mutate the parsed message in place. Nothing reads the old
+        # version from it once the upgrade has started, and this avoids
+        # a deep copy of the whole METADATA proto.
+        self.metadata.third_party.version = self.new_version
+        fileutils.write_metadata(path, self.metadata)
 
     def update(self):
         """Updates the package.
 
         Has to call check() before this function.
         """
-        upstream_branch = self.upstream_remote_name + '/master'
-
+        self._fetch_remotes()
         print("Running `git merge {merge_branch}`..."
               .format(merge_branch=self.new_version))
         git_utils.merge(self.proj_path, self.new_version)
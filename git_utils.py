@@ -26,13 +26,15 @@ def _run(cmd, cwd, redirect=True):
 
 
 def fetch(proj_path, remote_names):
-    """Runs git fetch.
+    """Runs git fetch for all remotes in one invocation.
 
     Args:
         proj_path: Path to Git repository.
         remote_names: Array of string to specify remote names.
+            None entries (remotes that could not be found) are skipped.
     """
-    _run(['git', 'fetch', '--multiple'] + remote_names, cwd=proj_path)
+    remotes = [name for name in remote_names if name is not None]
+    _run(['git', 'fetch', '--multiple'] + remotes, cwd=proj_path)
 
 
 def add_remote(proj_path, name, url):
@@ -99,12 +101,15 @@ def _parse_remote_tag(line):
 
 
 def list_remote_tags(proj_path, remote_name):
-    """Lists all tags for a remote."""
-    out = _run(['git', "ls-remote", "--tags", remote_name],
+    """Lists all tags for a remote.
+
+    --refs makes the server omit the peeled ^{} entries, so annotated
+    tags appear once instead of twice and no deduplication is needed.
+    """
+    out = _run(['git', "ls-remote", "--tags", "--refs", remote_name],
                cwd=proj_path)
     lines = out.stdout.decode('utf-8').splitlines()
-    tags = [_parse_remote_tag(line) for line in lines]
-    return list(set(tags))
+    return [_parse_remote_tag(line) for line in lines]
 
 
 COMMIT_PATTERN = r'^[a-f0-9]{40}$'
@@ -127,9 +132,14 @@ def merge(proj_path, branch):
         raise
 
 
+def add_files(proj_path, file_names):
+    """Stages files in a single git invocation."""
+    _run(['git', 'add'] + list(file_names), cwd=proj_path)
+
+
 def add_file(proj_path, file_name):
     """Stages a file."""
-    _run(['git', 'add', file_name], cwd=proj_path)
+    add_files(proj_path, [file_name])
 
 
 def delete_branch(proj_path, branch_name):
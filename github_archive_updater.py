@@ -14,8 +14,16 @@
 """Module to update packages from GitHub archive."""
 
 
+import atexit
+import gzip
+import http.client
 import json
+import os
 import re
+import tempfile
+import threading
+import time
+import urllib.parse
 import urllib.request
 
 import archive_utils
@@ -24,10 +32,167 @@ import git_utils
 import metadata_pb2    # pylint: disable=import-error
 import updater_utils
 
-GITHUB_URL_PATTERN = (r'^https:\/\/github.com\/([-\w]+)\/([-\w]+)\/' +
-                      r'(releases\/download\/|archive\/)')
+GITHUB_URL_PATTERN = (r'^https://github\.com/([-\w]+)/([-\w]+)/' +
+                      r'(releases/download/|archive/)')
 GITHUB_URL_RE = re.compile(GITHUB_URL_PATTERN)
 
+GITHUB_API_HOST = 'api.github.com'
+
+# Connections are kept alive and reused across requests to avoid paying
+# TCP and TLS setup for every project. One connection per thread, since
+# projects may be checked in parallel.
+_THREAD_LOCAL = threading.local()
+
+class _RateLimiter():
+    """Enforces a minimum interval between requests.
+
+    Thread-safe: parallel checks reserve send slots under a lock and
+    sleep outside of it.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next_request_time = 0
+
+    def wait(self):
+        """Blocks until a request may be sent."""
+        with self._lock:
+            now = time.monotonic()
+            wait_time = self._next_request_time - now
+            self._next_request_time = max(
+                now, self._next_request_time) + self.interval
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+
+_rate_limiter = None
+
+
+def set_rate_limit(interval):
+    """Limits GitHub API requests to one per `interval` seconds.
+
+    Projects that don't talk to the GitHub API are not throttled.
+    """
+    global _rate_limiter    # pylint: disable=global-statement
+    _rate_limiter = _RateLimiter(interval) if interval > 0 else None
+
+
+ETAG_CACHE_PATH = os.path.expanduser(
+    '~/.cache/external_updater/github_etags.json')
+
+_ETAG_CACHE_LOCK = threading.Lock()
+_etag_cache = None
+
+
+def _get_etag_cache():
+    """Loads the ETag cache on first use. Must hold _ETAG_CACHE_LOCK."""
+    global _etag_cache    # pylint: disable=global-statement
+    if _etag_cache is None:
+        try:
+            with open(ETAG_CACHE_PATH, 'r') as cache_file:
+                _etag_cache = json.load(cache_file)
+        except (IOError, ValueError):
+            _etag_cache = {}
+        atexit.register(_save_etag_cache)
+    return _etag_cache
+
+
+def _save_etag_cache():
+    """Writes the ETag cache back to disk atomically."""
+    cache_dir = os.path.dirname(ETAG_CACHE_PATH)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        file_descriptor, tmp_path = tempfile.mkstemp(dir=cache_dir)
+        with os.fdopen(file_descriptor, 'w') as cache_file:
+            json.dump(_etag_cache, cache_file)
+        os.replace(tmp_path, ETAG_CACHE_PATH)
+    except IOError:
+        # The cache is only an optimization. Ignore write failures.
+        pass
+
+
+# Renamed or transferred repositories answer with a redirect chain
+# before the real data; anything longer than this fails the request.
+MAX_REDIRECTS = 4
+
+
+def _github_api_request(path, headers):
+    """Sends one GET request, reusing the per-thread connection.
+
+    Returns:
+        A tuple of (response, body). The body is already read, so the
+        connection is ready for the next request.
+    """
+    connection = getattr(_THREAD_LOCAL, 'github_api_connection', None)
+    if connection is None:
+        connection = http.client.HTTPSConnection(GITHUB_API_HOST, timeout=30)
+        _THREAD_LOCAL.github_api_connection = connection
+    for retry_left in (1, 0):
+        try:
+            connection.request('GET', path, headers=headers)
+            response = connection.getresponse()
+            return (response, response.read())
+        except (http.client.HTTPException, ConnectionError):
+            # The server may have closed the kept-alive connection.
+            # Reconnect and try again.
+            connection.close()
+            if not retry_left:
+                raise
+
+
+def _github_api_get(path):
+    """Sends a GET request to the GitHub API and parses the response.
+
+    The underlying connection is kept alive and reused by later requests
+    from the same thread. Responses are cached with their ETag, so that
+    unchanged endpoints answer with an empty 304 instead of a full body.
+    Redirects for renamed repositories are followed.
+
+    Args:
+        path: Path of the API endpoint, e.g. /repos/owner/repo/releases.
+
+    Returns:
+        Parsed json data.
+
+    Raises:
+        IOError: Occurred when the request fails.
+    """
+    if _rate_limiter is not None:
+        _rate_limiter.wait()
+    with _ETAG_CACHE_LOCK:
+        cached = _get_etag_cache().get(path)
+    headers = {'User-Agent': 'external_updater',
+               'Accept-Encoding': 'gzip'}
+    if cached is not None:
+        headers['If-None-Match'] = cached['etag']
+    for _ in range(MAX_REDIRECTS):
+        response, data = _github_api_request(path, headers)
+        if response.status in (301, 302, 307, 308):
+            location = urllib.parse.urlsplit(
+                response.getheader('Location') or '')
+            if location.netloc != GITHUB_API_HOST:
+                break
+            path = location.path
+            if location.query:
+                path += '?' + location.query
+            continue
+        if response.status == 304:
+            return cached['data']
+        if response.status >= 300:
+            break
+        if response.getheader('Content-Encoding') == 'gzip':
+            data = gzip.decompress(data)
+        # json.loads accepts bytes directly; no need to decode.
+        parsed = json.loads(data)
+        etag = response.getheader('ETag')
+        if etag is not None:
+            with _ETAG_CACHE_LOCK:
+                _get_etag_cache()[path] = {'etag': etag, 'data': parsed}
+        return parsed
+    raise IOError('GET {} failed: {} {}'.format(
+        path, response.status, response.reason))
+
 
 def _edit_distance(str1, str2):
     prev = list(range(0, len(str2) + 1))
@@ -70,6 +235,7 @@ class GithubArchiveUpdater():
     """
 
     VERSION_FIELD = 'tag_name'
+    SUPPORTED_URL_TYPE = metadata_pb2.URL.ARCHIVE
 
     def __init__(self, url, proj_path, metadata):
         self.proj_path = proj_path
@@ -95,10 +261,8 @@ class GithubArchiveUpdater():
     def _fetch_latest_version(self):
         """Checks upstream and gets the latest release tag."""
 
-        url = 'https://api.github.com/repos/{}/{}/releases/latest'.format(
-            self.owner, self.repo)
-        with urllib.request.urlopen(url) as request:
-            data = json.loads(request.read().decode())
+        data = _github_api_get('/repos/{}/{}/releases/latest'.format(
+            self.owner, self.repo))
         self.new_version = data[self.VERSION_FIELD]
 
         supported_assets = [
@@ -118,10 +282,8 @@ class GithubArchiveUpdater():
     def _fetch_latest_commit(self):
         """Checks upstream and gets the latest commit to master."""
 
-        url = 'https://api.github.com/repos/{}/{}/commits/master'.format(
-            self.owner, self.repo)
-        with urllib.request.urlopen(url) as request:
-            data = json.loads(request.read().decode())
+        data = _github_api_get('/repos/{}/{}/commits/master'.format(
+            self.owner, self.repo))
         self.new_version = data['sha']
         self.new_url = 'https://github.com/{}/{}/archive/{}.zip'.format(
             self.owner, self.repo, self.new_version)
@@ -135,26 +297,25 @@ class GithubArchiveUpdater():
         return self.new_version
 
     def _write_metadata(self, url, path):
-        updated_metadata = metadata_pb2.MetaData()
-        updated_metadata.CopyFrom(self.metadata)
-        updated_metadata.third_party.version = self.new_version
-        for metadata_url in updated_metadata.third_party.url:
-            if metadata_url == self.old_url:
-                metadata_url.value = url
-        fileutils.write_metadata(path, updated_metadata)
+        # self.old_url is a reference into self.metadata, so mutating
+        # both in place updates the message directly. This avoids a deep
+        # copy of the proto and the submessage equality scan over urls.
+        self.metadata.third_party.version = self.new_version
+        self.old_url.value = url
+        fileutils.write_metadata(path, self.metadata)
 
     def check(self):
         """Checks update for package.
 
-        Returns True if a new version is available.
+        Returns a summary of the result.
         """
         current = self.get_current_version()
         if git_utils.is_commit(current):
             self._fetch_latest_commit()
         else:
             self._fetch_latest_version()
-        print('Current version: {}. Latest version: {}'.format(
-            current, self.new_version), end='')
+        return 'Current version: {}. Latest version: {}'.format(
+            current, self.new_version)
 
     def update(self):
         """Updates the package.
@@ -57,7 +57,7 @@ def parse_args():
     return parser.parse_args()
 
 
-CHANGE_URL_PATTERN = r'(https:\/\/[^\s]*android-review[^\s]*) Upgrade'
+CHANGE_URL_PATTERN = r'(https://\S*android-review\S*) Upgrade'
 CHANGE_URL_RE = re.compile(CHANGE_URL_PATTERN)
 
 
@@ -32,8 +32,15 @@ def create_updater(metadata, proj_path, updaters):
     Raises:
       ValueError: Occurred when there's no updater for all urls.
     """
+    updaters_by_url_type = {}
+    for updater in updaters:
+        updaters_by_url_type.setdefault(
+            updater.SUPPORTED_URL_TYPE, []).append(updater)
+
     for url in metadata.third_party.url:
-        for updater in updaters:
+        # Dispatch on url type so only plausible updaters are tried,
+        # instead of constructing (and rejecting) every updater per url.
+        for updater in updaters_by_url_type.get(url.type, ()):
             try:
                 return updater(url, proj_path, metadata)
             except ValueError: